@@ -1,10 +1,10 @@
 import argparse
+import hashlib
+import json
 import pathlib
 import subprocess
 import sys
 
-from packaging import version
-
 self_path = pathlib.Path(__file__).parent.resolve()
 
 _md = lambda effect: lambda f: [f, effect(f)][0]
@@ -14,12 +14,47 @@ cmd = lambda **kw: _md(lambda f: _ps(f).update(kw))
 arg = lambda *a, **k: _md(lambda f: _as(f).insert(0, (a, k)))
 
 
+rust_sources = ["serde_arrow/**/*.rs", "example/**/*.rs"]
+cargo_manifests = ["Cargo.toml", "*/Cargo.toml", "Cargo.lock"]
+
+# serde_arrow/src/lib.rs includes Implementation.md via include_str!
+build_inputs = [*rust_sources, "serde_arrow/**/*.md", *cargo_manifests]
+
+# clippy is never skipped (inputs None): it exits successfully on warnings,
+# which would otherwise be hidden on later runs
+precommit_stages = [
+    ("fmt", ["fmt"], rust_sources),
+    ("clippy", ["clippy"], None),
+    ("test", ["test"], build_inputs),
+    ("example", ["run", "--package", "example"], build_inputs),
+]
+
+
 @cmd()
-def precommit():
-    cargo("fmt")
-    cargo("clippy")
-    cargo("test")
-    cargo("run", "--package", "example")
+@arg("--force", action="store_true", help="run all stages, even if unchanged")
+def precommit(force=False):
+    cache_path = self_path / "target" / "precommit.json"
+    cache = {}
+    if not force and cache_path.exists():
+        cache = json.loads(cache_path.read_text())
+
+    for name, args, inputs in precommit_stages:
+        if inputs is None:
+            cargo(*args)
+            continue
+
+        # hash before running, so edits made while the stage runs are not
+        # recorded as checked (a reformat by cargo fmt costs one extra rerun)
+        h = inputs_hash(inputs)
+        if cache.get(name) == h:
+            print(f":: skip {name} (inputs unchanged)")
+            continue
+
+        cargo(*args)
+
+        cache[name] = h
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(json.dumps(cache, indent=2))
 
 
 @cmd()
@@ -40,6 +75,17 @@ def release():
         cargo("publish", cwd=self_path / "serde_arrow")
 
 
+def inputs_hash(patterns):
+    paths = sorted({p for pattern in patterns for p in self_path.glob(pattern)})
+
+    h = hashlib.blake2b()
+    for p in paths:
+        h.update(str(p.relative_to(self_path)).encode("utf8"))
+        h.update(p.stat().st_mtime_ns.to_bytes(8, "little"))
+
+    return h.hexdigest()
+
+
 def cargo(*args, **kwargs):
     return run("cargo", *args, **kwargs)
 